@@ -6,57 +6,22 @@ import pandas as pd
 import os
 import threading
 import time
-from youtube_agent import (
-    run_full_analysis, 
-    get_video_details, 
-    get_cached_transcription,
+import json
+from video_listing import get_video_details
+from transcription_cache import is_transcription_cached, get_model_rank, TRANSCRIPTIONS_DIR
+from processing_stats import (
     estimate_processing_time,
     format_time,
     get_average_processing_speed,
-    TRANSCRIPTIONS_DIR
+    get_stats_key
 )
-import json
-from pathlib import Path
-
-QUEUE_FILE = Path("jobs_queue.json")
-
-def get_queue_status():
-    if QUEUE_FILE.exists():
-        try:
-            queue = json.loads(QUEUE_FILE.read_text(encoding="utf-8"))
-        except Exception:
-            return 0, 0, 0, 0
-        total = len(queue)
-        done = sum(1 for job in queue if job.get("status") == "done")
-        running = sum(1 for job in queue if job.get("status") == "running")
-        pending = sum(1 for job in queue if job.get("status") == "pending")
-        return total, done, running, pending
-    return 0, 0, 0, 0
+from job_queue import QUEUE_FILE, get_queue_status, enqueue_jobs, get_dedup_summary
 
 def estimate_time_left(avg_speed, queue):
     # avg_speed en secondes par vidéo
     remaining = sum(1 for job in queue if job.get("status") in ("pending", "running"))
     return avg_speed * remaining
 
-def enqueue_jobs(video_urls, keywords, whisper_model, reset_queue=False):
-    if reset_queue or not QUEUE_FILE.exists():
-        queue = []
-    else:
-        try:
-            queue = json.loads(QUEUE_FILE.read_text(encoding="utf-8"))
-        except Exception:
-            queue = []
-    for url in video_urls:
-        job = {
-            "url": url,
-            "keywords": keywords,
-            "model": whisper_model,
-            "status": "pending",
-            "created_at": time.time()
-        }
-        queue.append(job)
-    QUEUE_FILE.write_text(json.dumps(queue, ensure_ascii=False, indent=2), encoding="utf-8")
-
 st.set_page_config(page_title="Agent d'Analyse YouTube", layout="wide")
 
 # Initialisation de l'état de la session
@@ -100,6 +65,19 @@ with st.sidebar:
         help="Les modèles plus grands sont plus précis mais beaucoup plus lents et gourmands en ressources. 'base' est un bon début.",
         disabled=st.session_state.fetching_videos
     )
+    # Seuls les modèles plus gros que le modèle rapide ont un intérêt en rattrapage
+    larger_models = [
+        model for model in ("small", "medium", "large-v2")
+        if get_model_rank(model) > get_model_rank(whisper_model)
+    ]
+    escalation_choice = st.selectbox(
+        "Modèle de rattrapage (cascade)",
+        ["Aucun"] + larger_models,
+        index=0,
+        help="Transcrit d'abord avec le modèle ci-dessus, puis ne retranscrit avec ce modèle plus gros que les passages peu fiables.",
+        disabled=st.session_state.fetching_videos
+    )
+    escalation_model = None if escalation_choice == "Aucun" else escalation_choice
 
     st.subheader("Suivi du traitement")
     total, done, running, pending = get_queue_status()
@@ -117,6 +95,12 @@ with st.sidebar:
             st.write(f"Estimation du temps restant : **{format_time(time_left)}**")
         except Exception:
             pass
+        try:
+            dedup_count, saved_seconds = get_dedup_summary(json.loads(QUEUE_FILE.read_text(encoding="utf-8")))
+            if dedup_count:
+                st.write(f"Doublons audio réutilisés : **{dedup_count}** (≈ {format_time(saved_seconds)} économisées)")
+        except Exception:
+            pass
 
     st.subheader("Lancer le worker en arrière-plan")
     st.markdown("Copiez la commande ci-dessous pour empêcher la mise en veille pendant le traitement :")
@@ -155,7 +139,7 @@ if st.session_state.fetching_error:
 # --- Fonction pour vérifier si une vidéo est en cache ---
 def is_video_cached(url: str) -> bool:
     """Vérifie si une vidéo a déjà été transcrite"""
-    return get_cached_transcription(url) is not None
+    return is_transcription_cached(url)
 
 # --- Affichage du sélecteur de vidéos et du panneau d'analyse ---
 if st.session_state.video_df is not None:
@@ -217,11 +201,14 @@ if st.session_state.video_df is not None:
     selected_videos = edited_df[edited_df["Sélectionner"]]
 
     st.header("Lancer l'analyse locale")
-    st.info(f"{len(selected_videos)} vidéo(s) sélectionnée(s) avec le modèle **{whisper_model}**.")
+    if escalation_model:
+        st.info(f"{len(selected_videos)} vidéo(s) sélectionnée(s) avec la cascade **{whisper_model} → {escalation_model}**.")
+    else:
+        st.info(f"{len(selected_videos)} vidéo(s) sélectionnée(s) avec le modèle **{whisper_model}**.")
     
     # Afficher les estimations de temps (avec mise en cache)
     if len(selected_videos) > 0:
-        avg_speed = get_average_processing_speed(whisper_model)
+        avg_speed = get_average_processing_speed(get_stats_key(whisper_model, escalation_model))
         
         # Calculer le temps estimé pour chaque vidéo
         estimated_times = []
@@ -276,7 +263,7 @@ if st.session_state.video_df is not None:
             st.warning("Veuillez sélectionner au moins une vidéo à analyser.")
         else:
             video_urls_to_analyze = selected_videos['url'].tolist()
-            enqueue_jobs(video_urls_to_analyze, [], whisper_model, reset_queue=True)
+            enqueue_jobs(video_urls_to_analyze, [], whisper_model, reset_queue=True, escalation_model=escalation_model)
             st.success(f"{len(video_urls_to_analyze)} vidéo(s) ajoutée(s) à la file d'attente.")
             st.info("Lancez le worker en arrière-plan pour traiter la file :\n\n```bash\ncaffeinate -i python3 youtube_worker.py\n```")
             if st.button("📋 Copier la commande", key="copy_worker_cmd_main"):
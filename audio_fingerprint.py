@@ -0,0 +1,310 @@
+# audio_fingerprint.py
+# Empreintes acoustiques (type Haitsma-Kalker) calculées sur l'audio 16 kHz décodé,
+# et index local SQLite pour retrouver une vidéo déjà transcrite : ré-upload complet
+# ou extrait (short) contenu dans une vidéo plus longue.
+# numpy n'est importé qu'au calcul d'une empreinte, pour garder ce module léger.
+
+import os
+import wave
+import zlib
+import sqlite3
+import threading
+from collections import Counter
+
+FINGERPRINT_DB = "audio_fingerprints.db"
+# Désactivable avec AUDIO_DEDUP=0
+DEDUP_ENABLED = os.environ.get("AUDIO_DEDUP", "1") != "0"
+
+SAMPLE_RATE = 16000
+FRAME_SIZE = 4096      # 256 ms
+HOP_SIZE = 256         # 16 ms : un pas fin limite le désalignement entre deux encodages
+BAND_EDGES_HZ = (300, 2000)
+BAND_COUNT = 33        # 33 bandes -> 32 bits par trame
+TEMPORAL_LAG = 4       # écart (en trames) de la dérivée temporelle, plus robuste que 1
+FRAMES_PER_BLOCK = 256  # ~4 s d'audio lues et analysées à la fois
+
+# Taille de l'index, à comparer aux ~20-30 Ko d'une heure de transcription compressée :
+# une trame sur POSTING_STRIDE est indexée (~2 s) et une sur VERIFY_STRIDE (~1 s) est
+# gardée pour la vérification, soit ~45 Ko par heure d'audio
+POSTING_STRIDE = 128
+VERIFY_STRIDE = 64
+# Côté requête, les FLIP_BITS bits les moins fiables de chaque trame sont inversés
+# (seuls puis par paires) : compense la rareté des postings
+FLIP_BITS = 8
+# Le vote ne porte que sur une fenêtre de la requête ; la vérification utilise tout
+QUERY_MAX_FRAMES = 7500    # ~2 min
+QUERY_BATCH_SIZE = 500
+SCHEMA_VERSION = 3
+# Coût moyen mesuré d'une ligne de postings dans SQLite (clé + en-têtes de page)
+POSTING_ROW_BYTES = 20
+
+# Critères de correspondance
+MIN_MATCH_FRAMES = 625       # ~10 s d'audio minimum
+MIN_OFFSET_VOTES = 2
+MAX_CANDIDATES = 5
+ALIGNMENT_SEARCH = 2
+MAX_BIT_ERROR_RATE = 0.30
+MIN_QUERY_COVERAGE = 0.90
+FULL_MATCH_DURATION_TOLERANCE = 0.05
+DEGENERATE_HASHES = (0, 0xFFFFFFFF)
+
+_write_lock = threading.Lock()
+
+def _band_bins():
+    import numpy as np
+    edges = np.geomspace(BAND_EDGES_HZ[0], BAND_EDGES_HZ[1], BAND_COUNT + 1)
+    return np.round(edges * FRAME_SIZE / SAMPLE_RATE).astype(int)
+
+def get_wav_duration(wav_path: str) -> float:
+    with wave.open(wav_path, 'rb') as wav_file:
+        return wav_file.getnframes() / wav_file.getframerate()
+
+def _iter_wav_blocks(wav_file, block_size: int):
+    # Échantillons mono float32 par blocs, sans charger tout le fichier en mémoire
+    import numpy as np
+    channels = wav_file.getnchannels()
+    while True:
+        raw = wav_file.readframes(block_size)
+        if not raw:
+            return
+        samples = np.frombuffer(raw, dtype=np.int16).astype(np.float32)
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1)
+        yield samples
+
+def compute_fingerprint(wav_path: str) -> tuple:
+    # Renvoie (sous-empreintes uint32, bits les moins fiables de chaque trame, durée en secondes)
+    import numpy as np
+    window = np.hanning(FRAME_SIZE).astype(np.float32)
+    bins = _band_bins()
+    weights = (1 << np.arange(31, -1, -1, dtype=np.uint64))
+    fingerprints, weak_bits = [], []
+    buffer = np.zeros(0, dtype=np.float32)
+    previous_diff = np.zeros((0, BAND_COUNT - 1), dtype=np.float32)
+    with wave.open(wav_path, 'rb') as wav_file:
+        if wav_file.getframerate() != SAMPLE_RATE or wav_file.getsampwidth() != 2:
+            raise ValueError(f"WAV 16 kHz 16 bits attendu : {wav_path}")
+        duration = wav_file.getnframes() / SAMPLE_RATE
+        for samples in _iter_wav_blocks(wav_file, FRAMES_PER_BLOCK * HOP_SIZE):
+            buffer = np.concatenate([buffer, samples])
+            if len(buffer) < FRAME_SIZE:
+                continue
+            frame_count = 1 + (len(buffer) - FRAME_SIZE) // HOP_SIZE
+            starts = np.arange(frame_count) * HOP_SIZE
+            frames = buffer[starts[:, None] + np.arange(FRAME_SIZE)] * window
+            # Garde le recouvrement nécessaire à la première trame du bloc suivant
+            buffer = buffer[frame_count * HOP_SIZE:]
+            power = np.abs(np.fft.rfft(frames, axis=1)) ** 2
+            cumulative = np.concatenate([np.zeros((frame_count, 1), dtype=power.dtype), np.cumsum(power, axis=1)], axis=1)
+            energies = cumulative[:, bins[1:]] - cumulative[:, bins[:-1]]
+            band_diff = np.concatenate([previous_diff, energies[:, :-1] - energies[:, 1:]])
+            previous_diff = band_diff[-TEMPORAL_LAG:]
+            delta = band_diff[TEMPORAL_LAG:] - band_diff[:-TEMPORAL_LAG]
+            fingerprints.append(((delta > 0).astype(np.uint64) * weights).sum(axis=1).astype(np.uint32))
+            # Un bit est peu fiable quand la différence d'énergie qui le fixe est proche de zéro
+            weak_bits.append(np.argsort(np.abs(delta), axis=1)[:, :FLIP_BITS].astype(np.uint8))
+    if not fingerprints:
+        return np.zeros(0, dtype=np.uint32), np.zeros((0, FLIP_BITS), dtype=np.uint8), duration
+    return np.concatenate(fingerprints), np.concatenate(weak_bits), duration
+
+def frames_to_seconds(frames: int) -> float:
+    return frames * HOP_SIZE / SAMPLE_RATE
+
+def _connect():
+    connection = sqlite3.connect(FINGERPRINT_DB, timeout=30)
+    if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        # Index dérivé : un ancien format est simplement reconstruit au fil des transcriptions
+        connection.execute("DROP TABLE IF EXISTS postings")
+        connection.execute("DROP TABLE IF EXISTS videos")
+        connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS videos ("
+        "id INTEGER PRIMARY KEY, url TEXT UNIQUE, duration REAL, frame_count INTEGER, "
+        "fingerprint BLOB, storage_bytes INTEGER)"
+    )
+    # Sans rowid : la clé primaire sert d'index de recherche, sans table séparée
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS postings ("
+        "hash INTEGER, video_id INTEGER, position INTEGER, "
+        "PRIMARY KEY (hash, video_id, position)) WITHOUT ROWID"
+    )
+    return connection
+
+def _decode_fingerprint(blob: bytes):
+    import numpy as np
+    return np.frombuffer(zlib.decompress(blob), dtype=np.uint32)
+
+def _delete_video(connection, video_id: int) -> None:
+    connection.execute("DELETE FROM postings WHERE video_id = ?", (video_id,))
+    connection.execute("DELETE FROM videos WHERE id = ?", (video_id,))
+
+def add_fingerprint(video_url: str, fingerprint, duration: float) -> None:
+    if len(fingerprint) < MIN_MATCH_FRAMES:
+        return
+    # Seule une trame sur VERIFY_STRIDE est conservée pour la vérification
+    blob = zlib.compress(fingerprint[::VERIFY_STRIDE].astype('<u4').tobytes())
+    postings = [
+        (int(fingerprint[position]), position)
+        for position in range(0, len(fingerprint), POSTING_STRIDE)
+        if int(fingerprint[position]) not in DEGENERATE_HASHES
+    ]
+    storage_bytes = len(blob) + len(postings) * POSTING_ROW_BYTES
+    with _write_lock:
+        connection = _connect()
+        try:
+            with connection:
+                row = connection.execute("SELECT id FROM videos WHERE url = ?", (video_url,)).fetchone()
+                if row:
+                    _delete_video(connection, row[0])
+                cursor = connection.execute(
+                    "INSERT INTO videos (url, duration, frame_count, fingerprint, storage_bytes) VALUES (?, ?, ?, ?, ?)",
+                    (video_url, duration, len(fingerprint), blob, storage_bytes)
+                )
+                video_id = cursor.lastrowid
+                connection.executemany(
+                    "INSERT OR IGNORE INTO postings (hash, video_id, position) VALUES (?, ?, ?)",
+                    [(hash_value, video_id, position) for hash_value, position in postings]
+                )
+        finally:
+            connection.close()
+
+def remove_fingerprints(video_urls: list) -> int:
+    # Supprime les empreintes des vidéos ; renvoie la place (estimée) libérée dans l'index
+    if not video_urls or not os.path.exists(FINGERPRINT_DB):
+        return 0
+    freed = 0
+    with _write_lock:
+        connection = _connect()
+        try:
+            with connection:
+                for video_url in video_urls:
+                    row = connection.execute("SELECT id, storage_bytes FROM videos WHERE url = ?", (video_url,)).fetchone()
+                    if row:
+                        _delete_video(connection, row[0])
+                        freed += row[1]
+        finally:
+            connection.close()
+    return freed
+
+def get_fingerprint_storage() -> dict:
+    # Place (estimée) occupée dans l'index par l'empreinte de chaque vidéo, en une requête
+    if not os.path.exists(FINGERPRINT_DB):
+        return {}
+    connection = _connect()
+    try:
+        return dict(connection.execute("SELECT url, storage_bytes FROM videos"))
+    finally:
+        connection.close()
+
+def get_database_size(connection) -> int:
+    # Taille utile d'une base SQLite : les pages libérées par des suppressions sont réutilisées
+    page_count = connection.execute("PRAGMA page_count").fetchone()[0]
+    freelist_count = connection.execute("PRAGMA freelist_count").fetchone()[0]
+    page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+    return (page_count - freelist_count) * page_size
+
+def get_index_size() -> int:
+    if not os.path.exists(FINGERPRINT_DB):
+        return 0
+    connection = sqlite3.connect(FINGERPRINT_DB, timeout=30)
+    try:
+        return get_database_size(connection)
+    finally:
+        connection.close()
+
+def bit_error_rate(query, reference, offset: int, frame_count: int) -> tuple:
+    # Taux de bits différents sur le recouvrement, et part de la requête recouverte.
+    # reference ne contient qu'une trame sur VERIFY_STRIDE de la vidéo indexée.
+    import numpy as np
+    query_start = max(0, -offset)
+    query_end = min(len(query), frame_count - offset)
+    if query_end <= query_start:
+        return 1.0, 0.0
+    first = query_start + (-(query_start + offset)) % VERIFY_STRIDE
+    query_frames = query[first:query_end:VERIFY_STRIDE]
+    reference_start = (first + offset) // VERIFY_STRIDE
+    reference_frames = reference[reference_start:reference_start + len(query_frames)]
+    compared = min(len(query_frames), len(reference_frames))
+    if compared == 0:
+        return 1.0, 0.0
+    overlap = query_frames[:compared] ^ reference_frames[:compared]
+    differing_bits = int(np.unpackbits(overlap.view(np.uint8)).sum())
+    return differing_bits / (32 * compared), (query_end - query_start) / len(query)
+
+def _query_hashes(fingerprint, weak_bits) -> dict:
+    # Hash -> positions dans la requête, pour chaque trame de la fenêtre de vote et ses
+    # variantes où un ou deux bits peu fiables sont inversés
+    import numpy as np
+    window_start = max(0, (len(fingerprint) - QUERY_MAX_FRAMES) // 2)
+    window_end = min(len(fingerprint), window_start + QUERY_MAX_FRAMES)
+    positions = np.arange(window_start, window_end)
+    hashes = fingerprint[window_start:window_end]
+    flip_masks = (np.uint32(1) << (31 - weak_bits[window_start:window_end]).astype(np.uint32))
+    keep = ~np.isin(hashes, DEGENERATE_HASHES)
+    positions, hashes, flip_masks = positions[keep], hashes[keep], flip_masks[keep]
+    variants = [hashes]
+    for first in range(FLIP_BITS):
+        variants.append(hashes ^ flip_masks[:, first])
+        for second in range(first + 1, FLIP_BITS):
+            variants.append(hashes ^ flip_masks[:, first] ^ flip_masks[:, second])
+    positions_by_hash = {}
+    for variant in variants:
+        for hash_value, position in zip(variant.tolist(), positions.tolist()):
+            positions_by_hash.setdefault(hash_value, []).append(position)
+    return positions_by_hash
+
+def find_fingerprint_matches(fingerprint, weak_bits, exclude_url: str = None) -> list:
+    # Vidéos indexées contenant tout l'audio de la requête, de la plus sûre à la moins sûre
+    if len(fingerprint) < MIN_MATCH_FRAMES or not os.path.exists(FINGERPRINT_DB):
+        return []
+    connection = _connect()
+    try:
+        positions_by_hash = _query_hashes(fingerprint, weak_bits)
+        votes = Counter()
+        hashes = list(positions_by_hash)
+        for batch_start in range(0, len(hashes), QUERY_BATCH_SIZE):
+            batch = hashes[batch_start:batch_start + QUERY_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = connection.execute(
+                f"SELECT hash, video_id, position FROM postings WHERE hash IN ({placeholders})", batch
+            )
+            for hash_value, video_id, position in rows:
+                for query_position in positions_by_hash[hash_value]:
+                    votes[(video_id, position - query_position)] += 1
+        # Meilleur décalage par vidéo, puis les vidéos les plus votées
+        best_offsets = {}
+        for (video_id, offset), vote_count in votes.most_common():
+            if vote_count < MIN_OFFSET_VOTES:
+                break
+            if video_id not in best_offsets:
+                best_offsets[video_id] = offset
+                if len(best_offsets) >= MAX_CANDIDATES:
+                    break
+        matches = []
+        for video_id, offset in best_offsets.items():
+            row = connection.execute(
+                "SELECT url, frame_count, fingerprint FROM videos WHERE id = ?", (video_id,)
+            ).fetchone()
+            if row is None or row[0] == exclude_url:
+                continue
+            source_url, source_frames, blob = row
+            reference = _decode_fingerprint(blob)
+            # Affine l'alignement autour du décalage voté
+            candidates = [bit_error_rate(fingerprint, reference, offset + delta, source_frames) + (offset + delta,)
+                          for delta in range(-ALIGNMENT_SEARCH, ALIGNMENT_SEARCH + 1)]
+            ber, coverage, aligned_offset = min(candidates)
+            if ber > MAX_BIT_ERROR_RATE or coverage < MIN_QUERY_COVERAGE:
+                continue
+            is_full = (aligned_offset <= ALIGNMENT_SEARCH and
+                       abs(source_frames - len(fingerprint)) <= FULL_MATCH_DURATION_TOLERANCE * source_frames)
+            matches.append({
+                'url': source_url,
+                'kind': 'full' if is_full else 'segment',
+                'offset': round(max(0.0, frames_to_seconds(aligned_offset)), 2),
+                'bit_error_rate': round(ber, 4),
+                'coverage': round(coverage, 4),
+                'source_duration': frames_to_seconds(source_frames),
+            })
+        return sorted(matches, key=lambda match: match['bit_error_rate'])
+    finally:
+        connection.close()
@@ -0,0 +1,139 @@
+# benchmarks/fake_yt_dlp.py
+# Remplaçant local de yt-dlp pour les benchmarks hors réseau.
+# Il comprend le sous-ensemble d'options utilisé par video_listing et youtube_agent :
+#   yt-dlp -J --flat-playlist https://www.youtube.com/playlist?list=bench-<N>  -> playlist synthétique
+#   yt-dlp -J https://www.youtube.com/watch?v=<id>                             -> métadonnées
+#   yt-dlp -x --audio-format mp3 -o <fichier> https://www.youtube.com/watch?v=<id> -> audio
+#
+# Variables d'environnement :
+#   FAKE_YT_DLP_DURATION   durée en secondes de l'audio synthétique (défaut 30)
+#   FAKE_YT_DLP_AUDIO_DIR  répertoire de fichiers audio fournis (utilisés à la place
+#                          de l'audio synthétique, choisis de façon déterministe par id)
+#   FAKE_YT_DLP_CACHE_DIR  répertoire où l'audio synthétique généré est réutilisé
+
+import os
+import re
+import sys
+import json
+import math
+import wave
+import array
+import random
+import shutil
+import hashlib
+import tempfile
+import subprocess
+from pathlib import Path
+
+SAMPLE_RATE = 16000
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a", ".flac", ".ogg", ".opus", ".webm")
+
+def get_duration() -> int:
+    return int(os.environ.get("FAKE_YT_DLP_DURATION", "30"))
+
+def get_video_id(url: str) -> str:
+    match = re.search(r'[?&]v=([^&]+)', url)
+    if match:
+        return match.group(1)
+    return hashlib.md5(url.encode()).hexdigest()[:11]
+
+def get_fixture(video_id: str) -> Path:
+    # Fichier audio fourni servant pour cette vidéo (None en mode synthétique)
+    audio_dir = os.environ.get("FAKE_YT_DLP_AUDIO_DIR")
+    if not audio_dir:
+        return None
+    fixtures = sorted(p for p in Path(audio_dir).iterdir() if p.suffix.lower() in AUDIO_EXTENSIONS)
+    if not fixtures:
+        raise SystemExit(f"Aucun fichier audio dans {audio_dir}")
+    index = int(hashlib.md5(video_id.encode()).hexdigest(), 16) % len(fixtures)
+    return fixtures[index]
+
+def get_fixture_duration(fixture: Path) -> int:
+    if fixture.suffix.lower() == ".wav":
+        with wave.open(str(fixture), 'rb') as wav_file:
+            return round(wav_file.getnframes() / wav_file.getframerate())
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", str(fixture)],
+        capture_output=True, text=True, check=True
+    )
+    return round(float(result.stdout.strip()))
+
+def build_video_entry(video_id: str) -> dict:
+    fixture = get_fixture(video_id)
+    return {
+        "id": video_id,
+        "title": f"Vidéo de benchmark {video_id}",
+        "duration": get_fixture_duration(fixture) if fixture else get_duration(),
+        "webpage_url": f"https://www.youtube.com/watch?v={video_id}",
+    }
+
+def build_playlist(url: str) -> dict:
+    match = re.search(r'list=bench-(\d+)', url)
+    count = int(match.group(1)) if match else 10
+    return {
+        "_type": "playlist",
+        "title": f"Playlist de benchmark ({count} vidéos)",
+        "entries": [build_video_entry(f"bench{i:06d}") for i in range(count)],
+    }
+
+def generate_synthetic_audio(output_path: Path, duration: int, seed: int = 0) -> None:
+    # Voyelles synthétiques : fondamentale + formants, modulées en syllabes, avec du bruit
+    rng = random.Random(seed)
+    samples = array.array('h')
+    syllable_length = int(SAMPLE_RATE * 0.25)
+    for _ in range(duration * SAMPLE_RATE // syllable_length):
+        f0 = rng.uniform(100, 220)
+        formants = (rng.uniform(300, 900), rng.uniform(900, 2500))
+        silent = rng.random() < 0.15
+        for n in range(syllable_length):
+            if silent:
+                samples.append(int(rng.gauss(0, 80)))
+                continue
+            t = n / SAMPLE_RATE
+            envelope = math.sin(math.pi * n / syllable_length)
+            value = (math.sin(2 * math.pi * f0 * t)
+                     + 0.5 * math.sin(2 * math.pi * formants[0] * t)
+                     + 0.25 * math.sin(2 * math.pi * formants[1] * t))
+            samples.append(int(6000 * envelope * value + rng.gauss(0, 200)))
+    with wave.open(str(output_path), 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(SAMPLE_RATE)
+        wav_file.writeframes(samples.tobytes())
+
+def write_audio(video_id: str, output_path: str) -> None:
+    fixture = get_fixture(video_id)
+    if fixture:
+        shutil.copyfile(fixture, output_path)
+        return
+    # ffmpeg détecte le format au contenu : un WAV nommé .mp3 est converti sans problème
+    duration = get_duration()
+    cache_dir = Path(os.environ.get("FAKE_YT_DLP_CACHE_DIR", tempfile.gettempdir()))
+    cached_audio = cache_dir / f"fake_yt_dlp_{duration}s.wav"
+    if not cached_audio.exists():
+        tmp_audio = cached_audio.with_name(f"{cached_audio.stem}.{os.getpid()}.tmp")
+        generate_synthetic_audio(tmp_audio, duration)
+        os.replace(tmp_audio, cached_audio)
+    shutil.copyfile(cached_audio, output_path)
+
+def main(argv=None):
+    args = list(sys.argv[1:] if argv is None else argv)
+    if not args:
+        print("Usage: yt-dlp [OPTIONS] URL", file=sys.stderr)
+        return 2
+    url = args[-1]
+    if "-x" in args:
+        output_path = args[args.index("-o") + 1]
+        write_audio(get_video_id(url), output_path)
+        return 0
+    if "-J" in args:
+        if "--flat-playlist" in args:
+            print(json.dumps(build_playlist(url), ensure_ascii=False))
+        else:
+            print(json.dumps(build_video_entry(get_video_id(url)), ensure_ascii=False))
+        return 0
+    print(f"Option non supportée par le faux yt-dlp : {' '.join(args)}", file=sys.stderr)
+    return 2
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+# benchmarks/pipeline.py
+# Benchmark reproductible du pipeline complet (liste, mise en file, worker,
+# transcription, analyse) sans réseau : yt-dlp est remplacé par benchmarks/fake_yt_dlp.py.
+# Les modèles Whisper doivent déjà être présents dans le cache local (~/.cache/whisper)
+# et ffmpeg/ffprobe installés.
+#
+#   python3 benchmarks/pipeline.py --videos 20 --models tiny base --workers 1 2
+#   python3 benchmarks/pipeline.py --audio-dir fixtures/ --output bench_output.json
+#   python3 benchmarks/pipeline.py --models "tiny>large-v2"   # cascade tiny puis large-v2
+#
+# Chaque combinaison (taille de file, modèle, nombre de workers) tourne dans un
+# processus séparé et un répertoire de travail vierge, pour que le pic de mémoire
+# et le cache de transcriptions ne soient pas partagés entre les mesures.
+
+import os
+import sys
+import json
+import time
+import stat
+import argparse
+import resource
+import tempfile
+import itertools
+import statistics
+import subprocess
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+FAKE_YT_DLP = Path(__file__).resolve().parent / "fake_yt_dlp.py"
+DEFAULT_KEYWORDS = ["gambit", "ouverture", "échecs"]
+
+def install_fake_yt_dlp(bin_dir: Path) -> None:
+    shim = bin_dir / "yt-dlp"
+    shim.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_YT_DLP}" "$@"\n', encoding="utf-8")
+    shim.chmod(shim.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+def summarize_latencies(latencies: list) -> dict:
+    if not latencies:
+        return {"count": 0}
+    ordered = sorted(latencies)
+    return {
+        "count": len(ordered),
+        "p50_ms": statistics.median(ordered) * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+def timed(function, latencies: list):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+    return wrapper
+
+def run_single(videos: int, model: str, workers: int, keywords: list) -> dict:
+    # Exécuté dans le répertoire de travail temporaire, avec le faux yt-dlp dans le PATH
+    sys.path.insert(0, str(REPO_DIR))
+    import job_queue
+    import youtube_agent
+    import youtube_worker
+    from video_listing import get_video_details
+    from transcription_cache import load_cache_entry
+
+    queue_latencies = {"load_queue": [], "save_queue": []}
+    youtube_worker.load_queue = timed(youtube_worker.load_queue, queue_latencies["load_queue"])
+    youtube_worker.save_queue = timed(youtube_worker.save_queue, queue_latencies["save_queue"])
+    transcribe_times = []
+    youtube_agent.transcribe_video_local = timed(youtube_agent.transcribe_video_local, transcribe_times)
+
+    start = time.perf_counter()
+    video_list = get_video_details(f"https://www.youtube.com/playlist?list=bench-{videos}")
+    list_seconds = time.perf_counter() - start
+    if len(video_list) != videos:
+        raise RuntimeError(f"{len(video_list)} vidéo(s) listée(s) au lieu de {videos}")
+
+    whisper_model, _, escalation_model = model.partition(">")
+    enqueue_latencies = []
+    timed(job_queue.enqueue_jobs, enqueue_latencies)(
+        [video["url"] for video in video_list], keywords, whisper_model,
+        reset_queue=True, escalation_model=escalation_model or None
+    )
+
+    start = time.perf_counter()
+    # Sans les pauses du worker, pour ne chronométrer que le travail réel
+    youtube_worker.main(max_workers=workers, poll_interval=0.05, batch_pause=0)
+    worker_seconds = time.perf_counter() - start
+
+    queue = job_queue.load_queue()
+    done = sum(1 for job in queue if job.get("status") == "done")
+    # Un job "done" sans transcription en cache signale un échec silencieux (ffmpeg, modèle...)
+    entries = [entry for entry in (load_cache_entry(job["url"]) for job in queue) if entry]
+    transcribed = len(entries)
+    # Durée réelle de l'audio décodé : les fichiers fournis (--audio-dir) ont chacun la leur
+    audio_seconds = sum(entry.get("audio_duration", 0) for entry in entries)
+    self_usage = resource.getrusage(resource.RUSAGE_SELF)
+    children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # ru_maxrss est en kilo-octets sous Linux et en octets sous macOS
+    rss_unit = 1 if sys.platform == "darwin" else 1024
+    result = {
+        "videos": videos,
+        "model": model,
+        "workers": workers,
+        "done": done,
+        "failed": sum(1 for job in queue if job.get("status") == "failed"),
+        "transcribed": transcribed,
+        "dedup_hits": sum(1 for job in queue if job.get("dedup")),
+        "list_seconds": list_seconds,
+        "worker_seconds": worker_seconds,
+        "videos_per_hour": transcribed / worker_seconds * 3600 if worker_seconds > 0 else 0,
+        "real_time_factor": sum(transcribe_times) / audio_seconds if audio_seconds else None,
+        "pipeline_real_time_factor": worker_seconds / audio_seconds if audio_seconds else None,
+        "peak_rss_mb": self_usage.ru_maxrss * rss_unit / 2**20,
+        "peak_child_rss_mb": children_usage.ru_maxrss * rss_unit / 2**20,
+        "queue_latency": {
+            "enqueue_jobs": summarize_latencies(enqueue_latencies),
+            "load_queue": summarize_latencies(queue_latencies["load_queue"]),
+            "save_queue": summarize_latencies(queue_latencies["save_queue"]),
+        },
+    }
+    if transcribed < videos:
+        # Mesure non comparable : on la marque en échec plutôt que de publier un débit trompeur
+        result["error"] = f"{videos - transcribed} vidéo(s) non transcrite(s) sur {videos}"
+    return result
+
+def run_isolated(videos: int, model: str, workers: int, args) -> dict:
+    with tempfile.TemporaryDirectory(prefix="videos_crawler_bench_") as work_dir:
+        bin_dir = Path(work_dir) / "bin"
+        bin_dir.mkdir()
+        install_fake_yt_dlp(bin_dir)
+        env = dict(os.environ)
+        env["PATH"] = f"{bin_dir}{os.pathsep}{env.get('PATH', '')}"
+        env["FAKE_YT_DLP_DURATION"] = str(args.duration)
+        env["FAKE_YT_DLP_CACHE_DIR"] = str(args.audio_cache_dir)
+        # L'audio synthétique est identique d'une vidéo à l'autre : sans --dedup, toutes
+        # les vidéos sauf la première seraient des doublons et la mesure n'aurait plus de sens
+        env["AUDIO_DEDUP"] = "1" if args.dedup else "0"
+        if args.audio_dir:
+            env["FAKE_YT_DLP_AUDIO_DIR"] = str(Path(args.audio_dir).resolve())
+        command = [
+            sys.executable, str(Path(__file__).resolve()), "--single",
+            "--videos", str(videos), "--models", model, "--workers", str(workers),
+            "--keywords", *args.keywords,
+        ]
+        result = subprocess.run(command, cwd=work_dir, env=env, capture_output=True, text=True)
+        if result.returncode != 0:
+            error = result.stderr.strip().splitlines()
+            return {"videos": videos, "model": model, "workers": workers,
+                    "error": error[-1] if error else f"code {result.returncode}"}
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+def get_git_commit() -> str:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                                capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except Exception:
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark du pipeline complet sans réseau")
+    parser.add_argument("--videos", type=int, nargs="+", default=[10], help="Tailles de file")
+    parser.add_argument("--models", nargs="+", default=["tiny"])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1])
+    parser.add_argument("--duration", type=int, default=30, help="Durée de l'audio synthétique (s)")
+    parser.add_argument("--audio-dir", help="Fichiers audio fournis à utiliser à la place de l'audio synthétique")
+    parser.add_argument("--audio-cache-dir", default=tempfile.gettempdir())
+    parser.add_argument("--keywords", nargs="+", default=DEFAULT_KEYWORDS)
+    parser.add_argument("--dedup", action="store_true", help="Active la déduplication par empreinte audio")
+    parser.add_argument("--output", help="Fichier JSON de sortie (sinon stdout)")
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.single:
+        # Sortie sur stderr pour garder stdout pour le JSON
+        real_stdout = sys.stdout
+        sys.stdout = sys.stderr
+        result = run_single(args.videos[0], args.models[0], args.workers[0], args.keywords)
+        sys.stdout = real_stdout
+        print(json.dumps(result, ensure_ascii=False))
+        return 0
+
+    runs = []
+    for videos, model, workers in itertools.product(args.videos, args.models, args.workers):
+        print(f"▶ {videos} vidéo(s), modèle {model}, {workers} worker(s)...", file=sys.stderr)
+        runs.append(run_isolated(videos, model, workers, args))
+    report = {
+        "commit": get_git_commit(),
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "cpu_count": os.cpu_count(),
+        "duration": args.duration,
+        "audio_dir": args.audio_dir,
+        "runs": runs,
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    else:
+        print(output)
+    failed_runs = [run for run in runs if "error" in run]
+    for run in failed_runs:
+        print(f"✗ {run['videos']} vidéo(s), modèle {run['model']}, {run['workers']} worker(s) : {run['error']}", file=sys.stderr)
+    return 1 if failed_runs else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
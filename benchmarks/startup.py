@@ -0,0 +1,108 @@
+# benchmarks/startup.py
+# Mesure le coût d'import de chaque module au démarrage (python -X importtime),
+# dans un interpréteur neuf par module, pour suivre les régressions de démarrage.
+#
+#   python3 benchmarks/startup.py
+#   python3 benchmarks/startup.py --modules youtube_agent whisper --repeat 5
+
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+import statistics
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_MODULES = [
+    "transcription_cache",
+    "job_queue",
+    "processing_stats",
+    "keyword_analysis",
+    "video_listing",
+    "youtube_agent",
+    "youtube_worker",
+]
+# Modules lourds dont la présence au démarrage est signalée
+HEAVY_MODULES = ["whisper", "torch", "numpy", "pandas", "streamlit", "urllib3"]
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def measure_import(module_name: str) -> dict:
+    probe = (
+        "import time\n"
+        "start = time.perf_counter()\n"
+        f"import {module_name}\n"
+        "elapsed = time.perf_counter() - start\n"
+        "import sys, json\n"
+        f"print(json.dumps({{'elapsed': elapsed, 'loaded': [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))\n"
+    )
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=REPO_DIR, capture_output=True, text=True, env=env
+    )
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()
+        return {"error": error[-1] if error else f"code {result.returncode}"}
+    probe_output = json.loads(result.stdout.strip().splitlines()[-1])
+    # Coût cumulé des imports de premier niveau déclenchés par le module
+    # (importtime affiche les dépendances avant le module qui les importe)
+    dependencies = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative_us, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        if indent == 1:
+            if name == module_name:
+                break
+            dependencies.clear()
+            continue
+        if indent == 3:
+            dependencies[name] = cumulative_us
+    top_dependencies = sorted(dependencies.items(), key=lambda item: item[1], reverse=True)[:5]
+    return {
+        "import_ms": probe_output["elapsed"] * 1000,
+        "heavy_modules_loaded": probe_output["loaded"],
+        "top_dependencies_ms": {name: us / 1000 for name, us in top_dependencies},
+    }
+
+def run_benchmark(modules: list, repeat: int) -> dict:
+    report = {}
+    for module_name in modules:
+        runs = [measure_import(module_name) for _ in range(repeat)]
+        failed = [run for run in runs if "error" in run]
+        if failed:
+            report[module_name] = {"error": failed[0]["error"]}
+            continue
+        timings = [run["import_ms"] for run in runs]
+        report[module_name] = {
+            "import_ms_median": statistics.median(timings),
+            "import_ms_min": min(timings),
+            "heavy_modules_loaded": runs[-1]["heavy_modules_loaded"],
+            "top_dependencies_ms": runs[-1]["top_dependencies_ms"],
+        }
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark du temps d'import au démarrage")
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Fichier JSON de sortie (sinon stdout)")
+    args = parser.parse_args(argv)
+
+    report = {
+        "python": sys.version.split()[0],
+        "modules": run_benchmark(args.modules, args.repeat),
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    else:
+        print(output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+# job_queue.py
+# File d'attente des transcriptions partagée entre l'interface Streamlit et le worker.
+
+import time
+import json
+from pathlib import Path
+
+QUEUE_FILE = Path("jobs_queue.json")
+
+def load_queue():
+    if QUEUE_FILE.exists():
+        try:
+            return json.loads(QUEUE_FILE.read_text(encoding="utf-8"))
+        except Exception:
+            return []
+    return []
+
+def save_queue(queue):
+    QUEUE_FILE.write_text(json.dumps(queue, ensure_ascii=False, indent=2), encoding="utf-8")
+
+def get_queue_status():
+    if QUEUE_FILE.exists():
+        try:
+            queue = json.loads(QUEUE_FILE.read_text(encoding="utf-8"))
+        except Exception:
+            return 0, 0, 0, 0
+        total = len(queue)
+        done = sum(1 for job in queue if job.get("status") == "done")
+        running = sum(1 for job in queue if job.get("status") == "running")
+        pending = sum(1 for job in queue if job.get("status") == "pending")
+        return total, done, running, pending
+    return 0, 0, 0, 0
+
+def enqueue_jobs(video_urls, keywords, whisper_model, reset_queue=False, escalation_model=None):
+    queue = [] if reset_queue else load_queue()
+    for url in video_urls:
+        job = {
+            "url": url,
+            "keywords": keywords,
+            "model": whisper_model,
+            "escalation_model": escalation_model,
+            "status": "pending",
+            "created_at": time.time()
+        }
+        queue.append(job)
+    save_queue(queue)
+
+def get_dedup_summary(queue):
+    # Nombre de doublons audio détectés et temps de transcription économisé (estimé)
+    dedup_jobs = [job["dedup"] for job in queue if job.get("dedup")]
+    return len(dedup_jobs), sum(dedup.get("saved_seconds", 0) for dedup in dedup_jobs)
@@ -0,0 +1,43 @@
+# keyword_analysis.py
+# Recherche de mots-clés dans les transcriptions.
+
+import re
+import unicodedata
+
+def normalize_text(text: str) -> str:
+    text = text.lower()
+    text = ''.join(
+        c for c in unicodedata.normalize('NFD', text)
+        if unicodedata.category(c) != 'Mn'
+    )
+    return text
+
+def compile_keywords(keywords: list) -> list:
+    # Précompile les motifs une seule fois pour les analyses en masse
+    compiled = []
+    for keyword in keywords:
+        keyword = keyword.strip()
+        keyword_words = normalize_text(keyword).split()
+        word_patterns = [re.compile(r'\b' + re.escape(word) + r'\b', re.IGNORECASE) for word in keyword_words]
+        if len(keyword_words) == 1:
+            flexible_pattern = word_patterns[0]
+        else:
+            pattern_parts = [r'\b' + re.escape(word) + r'\b' for word in keyword_words]
+            flexible_pattern = re.compile(r'\s+(?:\S+\s+){0,3}'.join(pattern_parts), re.IGNORECASE)
+        min_words_required = max(1, len(keyword_words) // 2)
+        compiled.append((keyword, word_patterns, flexible_pattern, min_words_required))
+    return compiled
+
+def count_keywords(normalized_transcript: str, compiled_keywords: list) -> dict:
+    analysis = {}
+    for keyword, word_patterns, flexible_pattern, min_words_required in compiled_keywords:
+        count = sum(1 for _ in flexible_pattern.finditer(normalized_transcript))
+        if count == 0 and len(word_patterns) > 1:
+            words_found = sum(1 for pattern in word_patterns if pattern.search(normalized_transcript))
+            if words_found >= min_words_required:
+                count = 1
+        analysis[keyword] = count
+    return analysis
+
+def analyze_transcription(transcription: str, keywords: list) -> dict:
+    return count_keywords(normalize_text(transcription), compile_keywords(keywords))
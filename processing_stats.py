@@ -0,0 +1,54 @@
+# processing_stats.py
+# Statistiques de vitesse de transcription par modèle et estimations de durée.
+
+import os
+import json
+
+STATS_FILE = "transcription_stats.json"
+
+def load_time_stats():
+    if os.path.exists(STATS_FILE):
+        try:
+            with open(STATS_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            pass
+    return {}
+
+def save_time_stats(stats):
+    try:
+        with open(STATS_FILE, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, ensure_ascii=False, indent=2)
+    except Exception:
+        pass
+
+def get_stats_key(whisper_model: str, escalation_model: str = None) -> str:
+    # Les cascades ont leurs propres statistiques, ex. "tiny>large-v2"
+    if escalation_model:
+        return f"{whisper_model}>{escalation_model}"
+    return whisper_model
+
+def get_average_processing_speed(model_name: str) -> float:
+    stats = load_time_stats()
+    model_stats = stats.get(model_name, {})
+    if model_stats.get('total_processing_time', 0) > 0 and model_stats.get('total_video_duration', 0) > 0:
+        return model_stats['total_video_duration'] / model_stats['total_processing_time']
+    return None
+
+def estimate_processing_time(video_duration_seconds: float, model_name: str) -> float:
+    speed = get_average_processing_speed(model_name)
+    if speed:
+        return video_duration_seconds / speed
+    return video_duration_seconds * 0.3
+
+def format_time(seconds: float) -> str:
+    if seconds < 60:
+        return f"{int(seconds)}s"
+    elif seconds < 3600:
+        minutes = int(seconds // 60)
+        secs = int(seconds % 60)
+        return f"{minutes}m {secs}s"
+    else:
+        hours = int(seconds // 3600)
+        minutes = int((seconds % 3600) // 60)
+        return f"{hours}h {minutes}m"
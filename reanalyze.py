@@ -0,0 +1,183 @@
+# reanalyze.py
+# Recherche de nouveaux mots-clés dans toutes les transcriptions du cache, sans
+# retranscrire : les fichiers du cache sont lus en flux et répartis sur un pool de processus.
+#
+#   python3 reanalyze.py "gambit, ouverture italienne" --output resultats.csv
+#   python3 reanalyze.py "gambit" --output resultats.parquet --processes 8
+
+import os
+import sys
+import csv
+import time
+import argparse
+import importlib.util
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from transcription_cache import iter_cache_files, read_cache_file
+from keyword_analysis import normalize_text, compile_keywords, count_keywords
+
+# Nombre de fichiers du cache traités par tâche (limite le coût d'IPC)
+BATCH_SIZE = 64
+# Nombre de lots en vol par processus : borne la mémoire quelle que soit la taille du cache
+MAX_PENDING_BATCHES_PER_PROCESS = 4
+PARQUET_ROW_GROUP_SIZE = 10000
+# Intervalle minimal (s) entre deux messages de progression
+PROGRESS_INTERVAL = 2.0
+PARQUET_MISSING_MESSAGE = "L'export Parquet nécessite pyarrow (pip install pyarrow)."
+
+_compiled_keywords = None
+
+def _init_worker(keywords):
+    global _compiled_keywords
+    _compiled_keywords = compile_keywords(keywords)
+
+def _analyze_batch(cache_files):
+    rows = []
+    analyzed = 0
+    for cache_file in cache_files:
+        data = read_cache_file(Path(cache_file))
+        # Fichiers illisibles et transcriptions vides ne comptent pas comme analysés
+        if not data or not data.get('transcript'):
+            continue
+        analyzed += 1
+        analysis = count_keywords(normalize_text(data['transcript']), _compiled_keywords)
+        for keyword, count in analysis.items():
+            if count > 0:
+                rows.append((keyword, data.get('title', ''), data.get('url', ''), count))
+    return analyzed, rows
+
+def _iter_batches(batch_size):
+    batch = []
+    for cache_file in iter_cache_files():
+        batch.append(str(cache_file))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+class CsvResultWriter:
+    def __init__(self, output_path):
+        self.file = open(output_path, 'w', encoding='utf-8', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(["keyword", "title", "url", "count"])
+
+    def write_rows(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+class ParquetResultWriter:
+    def __init__(self, output_path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError(PARQUET_MISSING_MESSAGE) from None
+        self.pa = pa
+        self.schema = pa.schema([
+            ("keyword", pa.string()),
+            ("title", pa.string()),
+            ("url", pa.string()),
+            ("count", pa.int64()),
+        ])
+        self.writer = pq.ParquetWriter(output_path, self.schema)
+        self.buffer = []
+
+    def write_rows(self, rows):
+        self.buffer.extend(rows)
+        if len(self.buffer) >= PARQUET_ROW_GROUP_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        columns = list(zip(*self.buffer))
+        table = self.pa.Table.from_arrays([self.pa.array(column) for column in columns], schema=self.schema)
+        self.writer.write_table(table)
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+def is_parquet_output(output_path) -> bool:
+    return Path(output_path).suffix.lower() == '.parquet'
+
+def open_result_writer(output_path):
+    if is_parquet_output(output_path):
+        return ParquetResultWriter(output_path)
+    return CsvResultWriter(output_path)
+
+def run_cache_reanalysis(keywords: list, output_path=None, processes=None, collect_details=True, progress_callback=None):
+    keywords = [keyword.strip() for keyword in keywords if keyword.strip()]
+    results = {
+        'total_videos': 0,
+        'total_occurrences': 0,
+        'occurrences_by_keyword': {keyword: 0 for keyword in keywords},
+        'details': {keyword: [] for keyword in keywords}
+    }
+    if not keywords:
+        return results
+    processes = processes or os.cpu_count() or 1
+    max_pending = processes * MAX_PENDING_BATCHES_PER_PROCESS
+    writer = open_result_writer(output_path) if output_path else None
+    try:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(keywords,)) as executor:
+            batches = _iter_batches(BATCH_SIZE)
+            pending = set()
+            exhausted = False
+            last_progress = time.monotonic()
+            while pending or not exhausted:
+                # Remplit la fenêtre de lots sans jamais lister tout le cache en mémoire
+                while not exhausted and len(pending) < max_pending:
+                    batch = next(batches, None)
+                    if batch is None:
+                        exhausted = True
+                    else:
+                        pending.add(executor.submit(_analyze_batch, batch))
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    analyzed, rows = future.result()
+                    results['total_videos'] += analyzed
+                    for keyword, title, url, count in rows:
+                        results['total_occurrences'] += count
+                        results['occurrences_by_keyword'][keyword] += count
+                        if collect_details:
+                            results['details'][keyword].append((title, url, count))
+                    if writer:
+                        writer.write_rows(rows)
+                if progress_callback and time.monotonic() - last_progress >= PROGRESS_INTERVAL:
+                    last_progress = time.monotonic()
+                    progress_callback(f"🔎 {results['total_videos']} transcription(s) analysée(s)")
+    finally:
+        if writer:
+            writer.close()
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Réanalyse de tout le cache de transcriptions avec de nouveaux mots-clés")
+    parser.add_argument("keywords", help="Mots-clés séparés par des virgules")
+    parser.add_argument("--output", "-o", required=True, help="Fichier de sortie (.csv ou .parquet)")
+    parser.add_argument("--processes", "-p", type=int, default=None, help="Nombre de processus (défaut : nombre de CPU)")
+    args = parser.parse_args(argv)
+
+    # Vérifié avant de démarrer le pool, pour échouer tout de suite avec un message clair
+    if is_parquet_output(args.output) and importlib.util.find_spec("pyarrow") is None:
+        print(PARQUET_MISSING_MESSAGE, file=sys.stderr)
+        return 1
+    keywords = args.keywords.split(',')
+    # Les résultats sont écrits au fil de l'eau : inutile de garder le détail en mémoire
+    results = run_cache_reanalysis(keywords, args.output, args.processes, collect_details=False, progress_callback=print)
+    print(f"🎉 Analyse terminée : {results['total_videos']} transcription(s), "
+          f"{results['total_occurrences']} occurrence(s).")
+    for keyword, count in results['occurrences_by_keyword'].items():
+        print(f"  {keyword} : {count}")
+    print(f"Résultats écrits dans {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
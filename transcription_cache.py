@@ -0,0 +1,328 @@
+# transcription_cache.py
+# Cache disque des transcriptions : répertoires shardés par préfixe de hash,
+# contenus compressés en gzip, budget disque et commande de compaction.
+
+import os
+import sys
+import json
+import gzip
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+import audio_fingerprint
+
+TRANSCRIPTIONS_DIR = "transcriptions_cache"
+# Nombre de caractères du hash utilisés pour nommer le sous-répertoire (256 shards)
+SHARD_PREFIX_LENGTH = 2
+# Budget disque en octets (0 = illimité), configurable par variable d'environnement
+CACHE_MAX_BYTES = int(os.environ.get("TRANSCRIPTIONS_CACHE_MAX_BYTES", "0"))
+# Politique d'éviction : "oldest" (plus anciennes d'abord) ou "weakest-model"
+# (transcriptions produites par les plus petits modèles d'abord)
+CACHE_EVICTION_POLICY = os.environ.get("TRANSCRIPTIONS_CACHE_EVICTION", "oldest")
+
+# Index des entrées (taille, rang du modèle, date) : le budget disque s'applique
+# sans parcourir ni décompresser le cache à chaque sauvegarde
+CACHE_INDEX_FILENAME = "index.db"
+
+MODEL_RANKS = {"tiny": 0, "base": 1, "small": 2, "medium": 3, "large": 4, "large-v2": 5}
+
+def get_model_rank(model_name) -> int:
+    if not model_name:
+        return -1
+    return MODEL_RANKS.get(model_name, -1)
+
+def get_entry_rank(data: dict) -> float:
+    rank = get_model_rank(data.get('model'))
+    escalation_model = data.get('escalation_model')
+    if escalation_model:
+        # Une cascade vaut mieux que son modèle rapide seul, mais moins que le gros modèle partout
+        return (rank + get_model_rank(escalation_model)) / 2
+    return rank
+
+def get_url_hash(video_url: str) -> str:
+    return hashlib.md5(video_url.encode()).hexdigest()
+
+def generate_cache_filename(video_url: str) -> str:
+    # Nom historique (format plat, non compressé)
+    return f"transcription_{get_url_hash(video_url)}.json"
+
+def get_cache_path(video_url: str) -> Path:
+    url_hash = get_url_hash(video_url)
+    return Path(TRANSCRIPTIONS_DIR) / url_hash[:SHARD_PREFIX_LENGTH] / f"{url_hash}.json.gz"
+
+def get_legacy_cache_path(video_url: str) -> Path:
+    return Path(TRANSCRIPTIONS_DIR) / generate_cache_filename(video_url)
+
+_index_lock = threading.Lock()
+
+def get_cache_index_path() -> Path:
+    return Path(TRANSCRIPTIONS_DIR) / CACHE_INDEX_FILENAME
+
+def _connect_index():
+    index_path = get_cache_index_path()
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    is_new = not index_path.exists()
+    connection = sqlite3.connect(index_path, timeout=30)
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS entries ("
+        "url TEXT PRIMARY KEY, path TEXT, size INTEGER, rank REAL, timestamp REAL)"
+    )
+    connection.execute("CREATE INDEX IF NOT EXISTS entries_eviction ON entries (rank, timestamp)")
+    if is_new:
+        # Première utilisation : indexe le cache existant (lecture unique de chaque fichier)
+        _fill_index(connection)
+    return connection
+
+def _fill_index(connection) -> int:
+    count = 0
+    with connection:
+        for cache_file in iter_cache_files():
+            data = read_cache_file(cache_file)
+            if not data or not data.get('url'):
+                continue
+            # Un ancien fichier plat déjà migré ne doit pas masquer sa version compressée
+            if cache_file.suffix != '.gz' and get_cache_path(data['url']).exists():
+                continue
+            _upsert_index_entry(connection, data, cache_file)
+            count += 1
+    return count
+
+def _upsert_index_entry(connection, data: dict, cache_file: Path) -> None:
+    connection.execute(
+        "INSERT OR REPLACE INTO entries (url, path, size, rank, timestamp) VALUES (?, ?, ?, ?, ?)",
+        (data['url'], str(cache_file), cache_file.stat().st_size, get_entry_rank(data), data.get('timestamp', 0))
+    )
+
+def index_cache_entry(data: dict, cache_file: Path) -> None:
+    with _index_lock:
+        connection = _connect_index()
+        try:
+            with connection:
+                _upsert_index_entry(connection, data, cache_file)
+        finally:
+            connection.close()
+
+def rebuild_cache_index() -> int:
+    with _index_lock:
+        index_path = get_cache_index_path()
+        if index_path.exists():
+            index_path.unlink()
+        connection = _connect_index()
+        try:
+            return connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        finally:
+            connection.close()
+
+def read_cache_file(cache_file: Path) -> dict:
+    try:
+        if cache_file.suffix == '.gz':
+            with gzip.open(cache_file, 'rt', encoding='utf-8') as f:
+                return json.load(f)
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+def write_cache_file(cache_file: Path, data: dict) -> None:
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = cache_file.with_name(cache_file.name + ".tmp")
+    with gzip.open(tmp_file, 'wt', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_file, cache_file)
+
+def is_transcription_cached(video_url: str) -> bool:
+    # Vérification rapide sans lecture ni décompression du fichier
+    return get_cache_path(video_url).exists() or get_legacy_cache_path(video_url).exists()
+
+def load_cache_entry(video_url: str) -> dict:
+    for cache_file in (get_cache_path(video_url), get_legacy_cache_path(video_url)):
+        if cache_file.exists():
+            data = read_cache_file(cache_file)
+            if data and data.get('url') == video_url:
+                return data
+    return None
+
+def get_cached_transcription(video_url: str) -> dict:
+    data = load_cache_entry(video_url)
+    if data:
+        print(f"✓ Transcription trouvée en cache pour : {data.get('title')}")
+    return data
+
+def save_transcription_cache(video_url: str, title: str, transcript: str, model: str = None, **extra) -> None:
+    cache_file = get_cache_path(video_url)
+    existing = load_cache_entry(video_url)
+    data = {
+        'url': video_url,
+        'title': title,
+        'transcript': transcript,
+        'model': model,
+        'timestamp': time.time()
+    }
+    data.update(extra)
+    # On ne garde que la meilleure transcription par vidéo
+    if existing and get_entry_rank(existing) > get_entry_rank(data):
+        print(f"✓ Transcription existante conservée (modèle {existing.get('model')}) : {title}")
+        return
+    try:
+        write_cache_file(cache_file, data)
+        legacy_file = get_legacy_cache_path(video_url)
+        if legacy_file.exists():
+            legacy_file.unlink()
+        print(f"✓ Transcription sauvegardée : {cache_file.name}")
+    except Exception:
+        return
+    try:
+        index_cache_entry(data, cache_file)
+        if CACHE_MAX_BYTES > 0:
+            enforce_cache_budget(CACHE_MAX_BYTES, CACHE_EVICTION_POLICY, keep_url=video_url)
+    except sqlite3.Error as e:
+        print(f"Index du cache indisponible : {e}")
+
+def iter_cache_files(include_legacy: bool = True):
+    cache_dir = Path(TRANSCRIPTIONS_DIR)
+    if not cache_dir.exists():
+        return
+    with os.scandir(cache_dir) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                with os.scandir(entry.path) as shard_entries:
+                    for shard_entry in shard_entries:
+                        if shard_entry.name.endswith('.json.gz'):
+                            yield Path(shard_entry.path)
+            elif include_legacy and entry.name.startswith('transcription_') and entry.name.endswith('.json'):
+                yield Path(entry.path)
+
+def iter_cached_transcriptions():
+    for cache_file in iter_cache_files():
+        data = read_cache_file(cache_file)
+        if data:
+            yield data
+
+def get_cache_stats() -> tuple:
+    # (nombre d'entrées, taille totale en octets) d'après l'index, bases SQLite comprises
+    with _index_lock:
+        connection = _connect_index()
+        try:
+            count, size = connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            index_size = audio_fingerprint.get_database_size(connection)
+        finally:
+            connection.close()
+    return count, size + index_size + audio_fingerprint.get_index_size()
+
+def get_cache_size() -> int:
+    return get_cache_stats()[1]
+
+def enforce_cache_budget(max_bytes: int, policy: str = "oldest", keep_url: str = None) -> int:
+    # Supprime des entrées jusqu'à repasser sous le budget ; renvoie le nombre d'octets libérés
+    if policy == "weakest-model":
+        order_by = "rank, timestamp"
+    elif policy == "oldest":
+        order_by = "timestamp"
+    else:
+        raise ValueError(f"Politique d'éviction inconnue : {policy}")
+    fingerprint_storage = audio_fingerprint.get_fingerprint_storage()
+    fingerprint_size = audio_fingerprint.get_index_size()
+    with _index_lock:
+        connection = _connect_index()
+        try:
+            entries_size = connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            index_size = audio_fingerprint.get_database_size(connection)
+            # L'index des empreintes audio compte dans le budget, comme l'index du cache.
+            # Coût fixe : ce qu'aucune éviction ne libère (index du cache, structure des bases)
+            fixed_size = index_size + max(0, fingerprint_size - sum(fingerprint_storage.values()))
+            total_size = entries_size + index_size + fingerprint_size
+            if total_size <= max_bytes:
+                return 0
+            if fixed_size >= max_bytes:
+                print(f"⚠️ Budget de {max_bytes} octets inférieur au coût fixe des index ({fixed_size} octets) : aucune éviction.")
+                return 0
+            freed_files = 0
+            estimated_freed = 0
+            evicted = []
+            rows = connection.execute(f"SELECT url, path, size FROM entries ORDER BY {order_by}")
+            for url, path, size in rows:
+                if total_size - estimated_freed <= max_bytes:
+                    break
+                if url == keep_url:
+                    continue
+                try:
+                    Path(path).unlink()
+                except FileNotFoundError:
+                    pass
+                except OSError:
+                    continue
+                freed_files += size
+                estimated_freed += size + fingerprint_storage.get(url, 0)
+                evicted.append(url)
+            # Sinon la lecture en cours garde un verrou sur l'index après close()
+            rows.close()
+            with connection:
+                connection.executemany("DELETE FROM entries WHERE url = ?", [(url,) for url in evicted])
+        finally:
+            connection.close()
+    # Une empreinte sans transcription ne sert plus à rien
+    freed = freed_files + audio_fingerprint.remove_fingerprints(evicted)
+    print(f"🧹 Cache : {freed} octets libérés (politique '{policy}').")
+    if not evicted:
+        print(f"⚠️ Budget de {max_bytes} octets non atteint : il ne reste que le coût fixe des index et les entrées protégées.")
+    elif get_cache_size() > max_bytes:
+        # Les pages SQLite ne sont libérées qu'une fois vides : l'estimation peut être optimiste
+        freed += enforce_cache_budget(max_bytes, policy, keep_url)
+    return freed
+
+def compact_cache() -> dict:
+    # Réécrit l'ancien format plat (JSON indenté) dans le format shardé et compressé
+    report = {'migrated': 0, 'skipped': 0, 'failed': 0}
+    for cache_file in list(iter_cache_files()):
+        if cache_file.suffix == '.gz':
+            continue
+        data = read_cache_file(cache_file)
+        if not data or not data.get('url'):
+            report['failed'] += 1
+            continue
+        target = get_cache_path(data['url'])
+        existing = read_cache_file(target) if target.exists() else None
+        try:
+            if existing is None or get_entry_rank(data) > get_entry_rank(existing):
+                write_cache_file(target, data)
+                index_cache_entry(data, target)
+                report['migrated'] += 1
+            else:
+                report['skipped'] += 1
+            cache_file.unlink()
+        except Exception:
+            report['failed'] += 1
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintenance du cache de transcriptions")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("compact", help="Migre l'ancien format plat vers le format shardé compressé")
+    evict_parser = subparsers.add_parser("evict", help="Applique un budget disque au cache")
+    evict_parser.add_argument("--max-bytes", type=int, default=CACHE_MAX_BYTES)
+    evict_parser.add_argument("--policy", choices=("oldest", "weakest-model"), default=CACHE_EVICTION_POLICY)
+    subparsers.add_parser("stats", help="Affiche la taille du cache")
+    subparsers.add_parser("reindex", help="Reconstruit l'index (après une modification manuelle du cache)")
+    args = parser.parse_args(argv)
+
+    if args.command == "compact":
+        report = compact_cache()
+        print(f"Compaction terminée : {report['migrated']} migrée(s), "
+              f"{report['skipped']} ignorée(s), {report['failed']} en échec.")
+    elif args.command == "evict":
+        if args.max_bytes <= 0:
+            print("Aucun budget défini (--max-bytes ou TRANSCRIPTIONS_CACHE_MAX_BYTES).")
+            return 1
+        enforce_cache_budget(args.max_bytes, args.policy)
+    elif args.command == "stats":
+        count, size = get_cache_stats()
+        print(f"{count} transcription(s), {size} octets.")
+    elif args.command == "reindex":
+        print(f"Index reconstruit : {rebuild_cache_index()} transcription(s).")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
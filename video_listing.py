@@ -0,0 +1,144 @@
+# video_listing.py
+# Récupération de la liste et des métadonnées des vidéos via yt-dlp.
+# Module volontairement léger : il n'importe ni whisper ni torch.
+
+import re
+import time
+import subprocess
+import json
+import locale
+
+def get_system_language() -> str:
+    try:
+        lang = locale.getlocale()[0]
+        if lang:
+            return lang.split('_')[0].lower()
+        else:
+            return 'en'
+    except:
+        return 'en'
+
+def get_channel_id_from_url(url: str) -> str:
+    match = re.search(r'/@([^/?]+)', url)
+    if match:
+        return f"@{match.group(1)}"
+    match = re.search(r'/channel/([^/?]+)', url)
+    if match:
+        return match.group(1)
+    match = re.search(r'/c/([^/?]+)', url)
+    if match:
+        return f"/c/{match.group(1)}"
+    return None
+
+def get_videos_from_channel(channel_identifier: str) -> list:
+    if channel_identifier.startswith('@'):
+        playlist_url = f"https://www.youtube.com/{channel_identifier}/videos"
+    else:
+        playlist_url = f"https://www.youtube.com/{channel_identifier}/videos"
+    try:
+        lang = get_system_language()
+        command = [
+            "yt-dlp",
+            "--quiet", "--no-warnings",
+            "-J",
+            "--flat-playlist",
+            "--no-check-certificates",
+            "--max-downloads", "1000",
+            "--extractor-args", f"youtube:lang={lang}",
+            playlist_url
+        ]
+        result = subprocess.run(command, capture_output=True, text=True, check=True, timeout=300)
+        data = json.loads(result.stdout)
+        videos_details = []
+        if data.get('_type') == 'playlist':
+            entries = data.get('entries', [])
+            for entry in entries:
+                if entry.get('id'):
+                    duration = entry.get('duration', 0)
+                    duration_formatted = time.strftime('%M:%S', time.gmtime(duration)) if duration else "N/A"
+                    videos_details.append({
+                        "title": entry.get('title', 'Titre indisponible'),
+                        "duration": duration_formatted,
+                        "url": f"https://www.youtube.com/watch?v={entry.get('id')}"
+                    })
+        return videos_details
+    except Exception:
+        return []
+
+def get_video_details(url_input: str) -> list:
+    is_channel = '/@' in url_input or '/channel/' in url_input or '/c/' in url_input
+    is_playlist = 'playlist?list=' in url_input
+    try:
+        if is_channel:
+            channel_id = get_channel_id_from_url(url_input)
+            if channel_id:
+                return get_videos_from_channel(channel_id)
+            else:
+                return []
+        elif is_playlist or not ('youtube.com/watch' in url_input or 'youtu.be' in url_input):
+            lang = get_system_language()
+            command = [
+                "yt-dlp",
+                "--quiet", "--no-warnings",
+                "-J",
+                "--flat-playlist",
+                "--no-check-certificates",
+                "--extractor-args", f"youtube:lang={lang}",
+                url_input
+            ]
+            result = subprocess.run(command, capture_output=True, text=True, check=True, timeout=120)
+            data = json.loads(result.stdout)
+            videos_details = []
+            if data.get('_type') == 'playlist':
+                for entry in data.get('entries', []):
+                    if entry.get('id'):
+                        duration = entry.get('duration', 0)
+                        duration_formatted = time.strftime('%M:%S', time.gmtime(duration)) if duration else "N/A"
+                        videos_details.append({
+                            "title": entry.get('title', 'Titre indisponible'),
+                            "duration": duration_formatted,
+                            "url": f"https://www.youtube.com/watch?v={entry.get('id')}"
+                        })
+            return videos_details
+        else:
+            lang = get_system_language()
+            command = [
+                "yt-dlp",
+                "--quiet", "--no-warnings",
+                "-J",
+                "--no-check-certificates",
+                "--extractor-args", f"youtube:lang={lang}",
+                url_input
+            ]
+            result = subprocess.run(command, capture_output=True, text=True, check=True, timeout=60)
+            data = json.loads(result.stdout)
+            duration = data.get('duration', 0)
+            duration_formatted = time.strftime('%M:%S', time.gmtime(duration)) if duration else "N/A"
+            return [{
+                "title": data.get('title', 'Titre indisponible'),
+                "duration": duration_formatted,
+                "url": data.get('webpage_url', url_input)
+            }]
+    except FileNotFoundError:
+        return []
+    except subprocess.CalledProcessError:
+        return []
+    except Exception:
+        return []
+
+def get_video_title(video_url: str) -> str:
+    try:
+        lang = get_system_language()
+        command = [
+            "yt-dlp",
+            "--quiet", "--no-warnings",
+            "-J",
+            "--no-check-certificates",
+            "--extractor-args", f"youtube:lang={lang}",
+            video_url
+        ]
+        result = subprocess.run(command, capture_output=True, text=True, check=True, timeout=60)
+        data = json.loads(result.stdout)
+        return data.get('title', 'Titre indisponible')
+    except Exception:
+        return "Titre indisponible"
@@ -1,241 +1,227 @@
 # youtube_agent.py
 # Ce fichier contient la logique backend pour l'analyse des chaînes YouTube.
+# Whisper (et donc torch) n'est importé qu'à la première transcription : la liste
+# des vidéos, le cache, la file d'attente et l'analyse sont dans des modules légers.
 
 import os
-import re
-import time
 import ssl
-import urllib3
+import time
 import subprocess
-import json
-from pathlib import Path
-import whisper
-import locale
+import threading
 import uuid
+from transcription_cache import (
+    TRANSCRIPTIONS_DIR,
+    generate_cache_filename,
+    get_cached_transcription,
+    is_transcription_cached,
+    load_cache_entry,
+    save_transcription_cache,
+    get_model_rank,
+    get_entry_rank
+)
+from processing_stats import (
+    STATS_FILE,
+    load_time_stats,
+    save_time_stats,
+    get_average_processing_speed,
+    estimate_processing_time,
+    format_time,
+    get_stats_key
+)
+from video_listing import (
+    get_system_language,
+    get_channel_id_from_url,
+    get_videos_from_channel,
+    get_video_details,
+    get_video_title
+)
+from keyword_analysis import normalize_text, analyze_transcription
+import audio_fingerprint
 
-ssl._create_default_https_context = ssl._create_unverified_context
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
-def get_system_language() -> str:
-    try:
-        lang = locale.getlocale()[0]
-        if lang:
-            return lang.split('_')[0].lower()
-        else:
-            return 'en'
-    except:
-        return 'en'
-
-TRANSCRIPTIONS_DIR = "transcriptions_cache"
-Path(TRANSCRIPTIONS_DIR).mkdir(exist_ok=True)
-STATS_FILE = "transcription_stats.json"
-
-def load_time_stats():
-    if os.path.exists(STATS_FILE):
-        try:
-            with open(STATS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception:
-            pass
-    return {}
-
-def save_time_stats(stats):
-    try:
-        with open(STATS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(stats, f, ensure_ascii=False, indent=2)
-    except Exception:
-        pass
-
-def get_average_processing_speed(model_name: str) -> float:
-    stats = load_time_stats()
-    model_stats = stats.get(model_name, {})
-    if model_stats.get('total_processing_time', 0) > 0 and model_stats.get('total_video_duration', 0) > 0:
-        return model_stats['total_video_duration'] / model_stats['total_processing_time']
-    return None
+# Cascade de modèles : seuils de confiance par segment (valeurs par défaut de whisper)
+CASCADE_LOGPROB_THRESHOLD = -1.0
+CASCADE_NO_SPEECH_THRESHOLD = 0.6
+# Segments faibles séparés de moins de CASCADE_MAX_GAP secondes retranscrits ensemble
+CASCADE_MAX_GAP = 1.0
+# Contexte audio ajouté autour d'une zone faible avant de la retranscrire
+CASCADE_PADDING = 0.5
+SAMPLE_RATE = 16000
 
-def estimate_processing_time(video_duration_seconds: float, model_name: str) -> float:
-    speed = get_average_processing_speed(model_name)
-    if speed:
-        return video_duration_seconds / speed
-    return video_duration_seconds * 0.3
+_ssl_configured = False
+# Un modèle par thread : les hooks de kv-cache de whisper ne supportent pas
+# deux transcriptions simultanées sur la même instance.
+_thread_models = threading.local()
 
-def format_time(seconds: float) -> str:
-    if seconds < 60:
-        return f"{int(seconds)}s"
-    elif seconds < 3600:
-        minutes = int(seconds // 60)
-        secs = int(seconds % 60)
-        return f"{minutes}m {secs}s"
-    else:
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        return f"{hours}h {minutes}m"
+def configure_ssl():
+    global _ssl_configured
+    if _ssl_configured:
+        return
+    import urllib3
+    ssl._create_default_https_context = ssl._create_unverified_context
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    _ssl_configured = True
 
 def load_whisper_model(model_name="base"):
+    models = getattr(_thread_models, 'models', None)
+    if models is None:
+        models = _thread_models.models = {}
+    if model_name in models:
+        return models[model_name]
+    configure_ssl()
+    import whisper
     print(f"Chargement du modèle Whisper '{model_name}'...")
     model = whisper.load_model(model_name)
     print(f"Modèle '{model_name}' chargé.")
+    models[model_name] = model
     return model
 
-def generate_cache_filename(video_url: str) -> str:
-    import hashlib
-    url_hash = hashlib.md5(video_url.encode()).hexdigest()
-    return f"transcription_{url_hash}.json"
+def build_segments(whisper_segments: list, model_name: str, offset: float = 0.0) -> list:
+    return [{
+        'start': round(segment['start'] + offset, 2),
+        'end': round(segment['end'] + offset, 2),
+        'text': segment['text'],
+        'model': model_name,
+        'avg_logprob': round(segment.get('avg_logprob', 0.0), 3),
+        'no_speech_prob': round(segment.get('no_speech_prob', 0.0), 3)
+    } for segment in whisper_segments]
 
-def get_cached_transcription(video_url: str) -> dict:
-    cache_file = Path(TRANSCRIPTIONS_DIR) / generate_cache_filename(video_url)
-    if cache_file.exists():
-        try:
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                if data.get('url') == video_url:
-                    print(f"✓ Transcription trouvée en cache pour : {data.get('title')}")
-                    return data
-        except Exception:
-            pass
-    return None
+def is_low_confidence(segment: dict) -> bool:
+    # Un segment probablement silencieux n'a pas besoin d'un modèle plus gros
+    if segment['no_speech_prob'] > CASCADE_NO_SPEECH_THRESHOLD:
+        return False
+    return segment['avg_logprob'] < CASCADE_LOGPROB_THRESHOLD
 
-def save_transcription_cache(video_url: str, title: str, transcript: str) -> None:
-    cache_file = Path(TRANSCRIPTIONS_DIR) / generate_cache_filename(video_url)
-    data = {
-        'url': video_url,
-        'title': title,
-        'transcript': transcript,
-        'timestamp': time.time()
-    }
-    try:
-        with open(cache_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        print(f"✓ Transcription sauvegardée : {cache_file.name}")
-    except Exception:
-        pass
+def find_low_confidence_spans(segments: list) -> list:
+    # Regroupe les segments faibles voisins en plages (index de début, index de fin inclus)
+    spans = []
+    for index, segment in enumerate(segments):
+        if not is_low_confidence(segment):
+            continue
+        if spans and spans[-1][1] == index - 1 and segment['start'] - segments[index - 1]['end'] <= CASCADE_MAX_GAP:
+            spans[-1][1] = index
+        else:
+            spans.append([index, index])
+    return [tuple(span) for span in spans]
 
-def get_channel_id_from_url(url: str) -> str:
-    match = re.search(r'/@([^/?]+)', url)
-    if match:
-        return f"@{match.group(1)}"
-    match = re.search(r'/channel/([^/?]+)', url)
-    if match:
-        return match.group(1)
-    match = re.search(r'/c/([^/?]+)', url)
-    if match:
-        return f"/c/{match.group(1)}"
-    return None
+def resolve_escalation_model(model_name: str, escalation_model: str) -> str:
+    # Retranscrire les passages difficiles avec un modèle qui n'est pas plus gros n'a pas de sens
+    if not escalation_model:
+        return None
+    if get_model_rank(escalation_model) <= get_model_rank(model_name):
+        print(f"Cascade ignorée : '{escalation_model}' n'est pas plus gros que '{model_name}'.")
+        return None
+    return escalation_model
 
-def get_videos_from_channel(channel_identifier: str) -> list:
-    if channel_identifier.startswith('@'):
-        playlist_url = f"https://www.youtube.com/{channel_identifier}/videos"
-    else:
-        playlist_url = f"https://www.youtube.com/{channel_identifier}/videos"
-    try:
-        lang = get_system_language()
-        command = [
-            "yt-dlp",
-            "--quiet", "--no-warnings",
-            "-J",
-            "--flat-playlist",
-            "--no-check-certificates",
-            "--max-downloads", "1000",
-            "--extractor-args", f"youtube:lang={lang}",
-            playlist_url
+def build_span_segments(whisper_segments: list, model_name: str, offset: float, span_start: float, span_end: float) -> list:
+    # Ne garde que les mots dans la plage : le contexte ajouté autour est retranscrit mais ignoré
+    span_segments = []
+    for segment in whisper_segments:
+        words = [
+            word for word in segment.get('words', [])
+            if span_start <= (word['start'] + word['end']) / 2 + offset <= span_end
         ]
-        result = subprocess.run(command, capture_output=True, text=True, check=True, timeout=300)
-        data = json.loads(result.stdout)
-        videos_details = []
-        if data.get('_type') == 'playlist':
-            entries = data.get('entries', [])
-            for entry in entries:
-                if entry.get('id'):
-                    duration = entry.get('duration', 0)
-                    duration_formatted = time.strftime('%M:%S', time.gmtime(duration)) if duration else "N/A"
-                    videos_details.append({
-                        "title": entry.get('title', 'Titre indisponible'),
-                        "duration": duration_formatted,
-                        "url": f"https://www.youtube.com/watch?v={entry.get('id')}"
-                    })
-        return videos_details
-    except Exception:
-        return []
+        if not words:
+            continue
+        span_segments.append({
+            'start': round(max(span_start, words[0]['start'] + offset), 2),
+            'end': round(min(span_end, words[-1]['end'] + offset), 2),
+            'text': ''.join(word['word'] for word in words),
+            'model': model_name,
+            'avg_logprob': round(segment.get('avg_logprob', 0.0), 3),
+            'no_speech_prob': round(segment.get('no_speech_prob', 0.0), 3)
+        })
+    return span_segments
 
-def get_video_details(url_input: str) -> list:
-    is_channel = '/@' in url_input or '/channel/' in url_input or '/c/' in url_input
-    is_playlist = 'playlist?list=' in url_input
-    try:
-        if is_channel:
-            channel_id = get_channel_id_from_url(url_input)
-            if channel_id:
-                return get_videos_from_channel(channel_id)
-            else:
-                return []
-        elif is_playlist or not ('youtube.com/watch' in url_input or 'youtu.be' in url_input):
-            lang = get_system_language()
-            command = [
-                "yt-dlp",
-                "--quiet", "--no-warnings",
-                "-J",
-                "--flat-playlist",
-                "--no-check-certificates",
-                "--extractor-args", f"youtube:lang={lang}",
-                url_input
-            ]
-            result = subprocess.run(command, capture_output=True, text=True, check=True, timeout=120)
-            data = json.loads(result.stdout)
-            videos_details = []
-            if data.get('_type') == 'playlist':
-                for entry in data.get('entries', []):
-                    if entry.get('id'):
-                        duration = entry.get('duration', 0)
-                        duration_formatted = time.strftime('%M:%S', time.gmtime(duration)) if duration else "N/A"
-                        videos_details.append({
-                            "title": entry.get('title', 'Titre indisponible'),
-                            "duration": duration_formatted,
-                            "url": f"https://www.youtube.com/watch?v={entry.get('id')}"
-                        })
-            return videos_details
-        else:
-            lang = get_system_language()
-            command = [
-                "yt-dlp",
-                "--quiet", "--no-warnings",
-                "-J",
-                "--no-check-certificates",
-                "--extractor-args", f"youtube:lang={lang}",
-                url_input
-            ]
-            result = subprocess.run(command, capture_output=True, text=True, check=True, timeout=60)
-            data = json.loads(result.stdout)
-            duration = data.get('duration', 0)
-            duration_formatted = time.strftime('%M:%S', time.gmtime(duration)) if duration else "N/A"
-            return [{
-                "title": data.get('title', 'Titre indisponible'),
-                "duration": duration_formatted,
-                "url": data.get('webpage_url', url_input)
-            }]
-    except FileNotFoundError:
-        return []
-    except subprocess.CalledProcessError:
-        return []
-    except Exception:
-        return []
+def transcribe_with_cascade(wav_filename: str, model_name: str, escalation_model: str, progress_callback=None) -> tuple:
+    # Première passe rapide, puis retranscription des seules zones peu fiables avec le gros modèle.
+    # escalation_model est déjà validé par run_full_analysis (resolve_escalation_model)
+    fast_model = load_whisper_model(model_name)
+    result = fast_model.transcribe(wav_filename, fp16=False)
+    segments = build_segments(result.get('segments', []), model_name)
+    spans = find_low_confidence_spans(segments) if escalation_model else []
+    if not spans:
+        return result['text'], segments
+    if progress_callback:
+        progress_callback(f"🔁 Cascade : {len(spans)} zone(s) peu fiable(s) retranscrite(s) avec '{escalation_model}'")
+    import whisper
+    audio = whisper.load_audio(wav_filename)
+    large_model = load_whisper_model(escalation_model)
+    # Traitement de la fin vers le début pour que les index des plages restent valides
+    for first, last in reversed(spans):
+        span_start, span_end = segments[first]['start'], segments[last]['end']
+        clip_start = max(0.0, span_start - CASCADE_PADDING)
+        clip_end = span_end + CASCADE_PADDING
+        clip = audio[int(clip_start * SAMPLE_RATE):int(clip_end * SAMPLE_RATE)]
+        clip_result = large_model.transcribe(
+            clip, fp16=False, language=result.get('language'), word_timestamps=True
+        )
+        replacement = build_span_segments(
+            clip_result.get('segments', []), escalation_model, clip_start, span_start, span_end
+        )
+        if replacement:
+            segments[first:last + 1] = replacement
+    transcript = ''.join(segment['text'] for segment in segments)
+    return transcript, segments
 
-def get_video_title(video_url: str) -> str:
-    try:
-        lang = get_system_language()
-        command = [
-            "yt-dlp",
-            "--quiet", "--no-warnings",
-            "-J",
-            "--no-check-certificates",
-            "--extractor-args", f"youtube:lang={lang}",
-            video_url
-        ]
-        result = subprocess.run(command, capture_output=True, text=True, check=True, timeout=60)
-        data = json.loads(result.stdout)
-        return data.get('title', 'Titre indisponible')
-    except Exception:
-        return "Titre indisponible"
+def derive_transcription_from_match(match: dict, audio_duration: float) -> tuple:
+    # Reconstruit la transcription d'un doublon à partir de celle de la vidéo source
+    source = load_cache_entry(match['url'])
+    if not source or not source.get('transcript'):
+        return None
+    if match['kind'] == 'full':
+        return source['transcript'], source.get('segments'), source
+    # Extrait : il faut les horodatages des segments pour découper la transcription source
+    segments = source.get('segments')
+    if not segments:
+        return None
+    clip_start = match['offset']
+    clip_end = clip_start + audio_duration
+    derived = [
+        dict(segment,
+             start=round(max(segment['start'], clip_start) - clip_start, 2),
+             end=round(min(segment['end'], clip_end) - clip_start, 2))
+        for segment in segments
+        if clip_start <= (segment['start'] + segment['end']) / 2 <= clip_end
+    ]
+    if not derived:
+        return None
+    return ''.join(segment['text'] for segment in derived), derived, source
 
-def transcribe_video_local(video_url: str, model_name: str, progress_callback=None) -> tuple:
+def transcribe_from_duplicate(video_url: str, video_title: str, fingerprint, weak_bits, audio_duration: float,
+                              model_name: str, escalation_model: str = None, progress_callback=None) -> str:
+    # Les candidats sont essayés dans l'ordre : la meilleure source a pu être évincée du cache
+    requested_rank = get_entry_rank({'model': model_name, 'escalation_model': escalation_model})
+    stale_urls = []
+    for match in audio_fingerprint.find_fingerprint_matches(fingerprint, weak_bits, exclude_url=video_url):
+        if not is_transcription_cached(match['url']):
+            stale_urls.append(match['url'])
+            continue
+        derived = derive_transcription_from_match(match, audio_duration)
+        # Une source transcrite avec un modèle plus petit que celui demandé n'est pas réutilisée
+        if derived and get_entry_rank(derived[2]) >= requested_rank:
+            break
+    else:
+        derived = None
+    audio_fingerprint.remove_fingerprints(stale_urls)
+    if not derived:
+        return None
+    transcript, segments, source = derived
+    if progress_callback:
+        progress_callback(f"♻️ Doublon audio de {source.get('title', match['url'])[:50]} : transcription réutilisée")
+    save_transcription_cache(
+        video_url, video_title, transcript,
+        model=source.get('model'),
+        escalation_model=source.get('escalation_model'),
+        segments=segments,
+        audio_duration=round(audio_duration, 2),
+        dedup_of=match['url'],
+        dedup_kind=match['kind'],
+        dedup_offset=match['offset'],
+        dedup_bit_error_rate=match['bit_error_rate']
+    )
+    return transcript
+
+def transcribe_video_local(video_url: str, model_name: str, progress_callback=None, escalation_model: str = None) -> tuple:
     start_time = time.time()
     cached = get_cached_transcription(video_url)
     if cached:
@@ -266,12 +252,40 @@ def transcribe_video_local(video_url: str, model_name: str, progress_callback=No
         file_size = os.path.getsize(wav_filename)
         if file_size < 1000 or not is_wav_valid(wav_filename):
             return "", video_title, 0
-        model = load_whisper_model(model_name)
-        result = model.transcribe(wav_filename, fp16=False)
-        transcript = result["text"]
+        fingerprint = None
+        audio_duration = audio_fingerprint.get_wav_duration(wav_filename)
+        if audio_fingerprint.DEDUP_ENABLED:
+            try:
+                fingerprint, weak_bits, audio_duration = audio_fingerprint.compute_fingerprint(wav_filename)
+                transcript = transcribe_from_duplicate(
+                    video_url, video_title, fingerprint, weak_bits, audio_duration,
+                    model_name, escalation_model, progress_callback
+                )
+                if transcript is not None:
+                    # Pas de temps de traitement : les statistiques de vitesse du modèle restent justes
+                    return transcript, video_title, 0
+            except Exception as e:
+                print(f"Empreinte audio indisponible pour {video_url}: {type(e).__name__}: {e}")
+                fingerprint = None
+        transcript, segments = transcribe_with_cascade(wav_filename, model_name, escalation_model, progress_callback)
         if progress_callback:
             progress_callback(f"💾 Sauvegarde du cache : {video_title[:50]}")
-        save_transcription_cache(video_url, video_title, transcript)
+        escalated_seconds = sum(
+            segment['end'] - segment['start'] for segment in segments if segment['model'] != model_name
+        )
+        save_transcription_cache(
+            video_url, video_title, transcript,
+            model=model_name,
+            escalation_model=escalation_model,
+            escalated_seconds=round(escalated_seconds, 2),
+            segments=segments,
+            audio_duration=round(audio_duration, 2)
+        )
+        if fingerprint is not None:
+            try:
+                audio_fingerprint.add_fingerprint(video_url, fingerprint, audio_duration)
+            except Exception as e:
+                print(f"Indexation de l'empreinte échouée pour {video_url}: {type(e).__name__}: {e}")
         processing_time = time.time() - start_time
         return transcript, video_title, processing_time
     except Exception as e:
@@ -282,43 +296,7 @@ def transcribe_video_local(video_url: str, model_name: str, progress_callback=No
             if os.path.exists(f):
                 os.remove(f)
 
-def normalize_text(text: str) -> str:
-    import unicodedata
-    text = text.lower()
-    text = ''.join(
-        c for c in unicodedata.normalize('NFD', text)
-        if unicodedata.category(c) != 'Mn'
-    )
-    return text
-
-def analyze_transcription(transcription: str, keywords: list) -> dict:
-    analysis = {}
-    normalized_transcript = normalize_text(transcription)
-    for keyword in keywords:
-        keyword = keyword.strip()
-        normalized_keyword = normalize_text(keyword)
-        keyword_words = normalized_keyword.split()
-        count = 0
-        if len(keyword_words) == 1:
-            pattern = r'\b' + re.escape(keyword_words[0]) + r'\b'
-            count = len(re.findall(pattern, normalized_transcript, re.IGNORECASE))
-        else:
-            min_words_required = max(1, len(keyword_words) // 2)
-            pattern_parts = [r'\b' + re.escape(word) + r'\b' for word in keyword_words]
-            flexible_pattern = r'\s+(?:\S+\s+){0,3}'.join(pattern_parts)
-            matches = re.finditer(flexible_pattern, normalized_transcript, re.IGNORECASE)
-            count = len(list(matches))
-            if count == 0:
-                words_found = 0
-                for word in keyword_words:
-                    if re.search(r'\b' + re.escape(word) + r'\b', normalized_transcript, re.IGNORECASE):
-                        words_found += 1
-                if words_found >= min_words_required:
-                    count = 1
-        analysis[keyword] = count
-    return analysis
-
-def run_full_analysis(video_urls: list, keywords: list, whisper_model: str, progress_callback=None, stop_flag=None):
+def run_full_analysis(video_urls: list, keywords: list, whisper_model: str, progress_callback=None, stop_flag=None, escalation_model: str = None):
     total_videos = len(video_urls)
     if total_videos == 0:
         return {'total_videos': 0, 'total_occurrences': 0, 'details': {}}
@@ -327,9 +305,11 @@ def run_full_analysis(video_urls: list, keywords: list, whisper_model: str, prog
         'total_occurrences': 0,
         'details': {keyword.strip(): [] for keyword in keywords}
     }
+    escalation_model = resolve_escalation_model(whisper_model, escalation_model)
     stats = load_time_stats()
-    if whisper_model not in stats:
-        stats[whisper_model] = {
+    stats_key = get_stats_key(whisper_model, escalation_model)
+    if stats_key not in stats:
+        stats[stats_key] = {
             'total_processing_time': 0,
             'total_video_duration': 0,
             'video_count': 0
@@ -341,18 +321,19 @@ def run_full_analysis(video_urls: list, keywords: list, whisper_model: str, prog
         status = f"📹 Vidéo {i+1}/{total_videos}"
         if progress_callback:
             progress_callback(status)
-        transcription, title, processing_time = transcribe_video_local(url, whisper_model, progress_callback)
+        transcription, title, processing_time = transcribe_video_local(url, whisper_model, progress_callback, escalation_model)
         if processing_time > 0:
             try:
+                configure_ssl()
                 from pytube import YouTube
                 yt = YouTube(url)
                 video_duration = yt.length
             except:
                 video_duration = 0
             if video_duration > 0:
-                stats[whisper_model]['total_processing_time'] += processing_time
-                stats[whisper_model]['total_video_duration'] += video_duration
-                stats[whisper_model]['video_count'] += 1
+                stats[stats_key]['total_processing_time'] += processing_time
+                stats[stats_key]['total_video_duration'] += video_duration
+                stats[stats_key]['video_count'] += 1
                 save_time_stats(stats)
         if transcription:
             analysis = analyze_transcription(transcription, keywords)
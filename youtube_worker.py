@@ -1,37 +1,42 @@
 import time
-import json
-from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from youtube_agent import run_full_analysis, get_cached_transcription
+from job_queue import load_queue, save_queue
+from transcription_cache import is_transcription_cached, load_cache_entry
+from processing_stats import estimate_processing_time, get_stats_key
+from youtube_agent import run_full_analysis
 
-QUEUE_FILE = Path("jobs_queue.json")
 MAX_WORKERS = 2  # Ajuste selon la puissance de ta machine
+POLL_INTERVAL = 5  # Attente (s) quand des jobs tournent encore ailleurs
+BATCH_PAUSE = 2  # Pause (s) entre deux lots de jobs
 
-def load_queue():
-    if QUEUE_FILE.exists():
-        try:
-            return json.loads(QUEUE_FILE.read_text(encoding="utf-8"))
-        except Exception:
-            return []
-    return []
-
-def save_queue(queue):
-    QUEUE_FILE.write_text(json.dumps(queue, ensure_ascii=False, indent=2), encoding="utf-8")
+def get_dedup_record(job):
+    # Si la transcription vient d'un doublon audio, renvoie de quoi mesurer le calcul économisé
+    entry = load_cache_entry(job["url"])
+    if not entry or not entry.get("dedup_of"):
+        return None
+    stats_key = get_stats_key(job["model"], job.get("escalation_model"))
+    return {
+        "source_url": entry["dedup_of"],
+        "kind": entry.get("dedup_kind"),
+        "offset": entry.get("dedup_offset"),
+        "audio_duration": entry.get("audio_duration", 0),
+        "saved_seconds": round(estimate_processing_time(entry.get("audio_duration", 0), stats_key), 1)
+    }
 
 def process_job(idx, job):
     url = job["url"]
     print(f"[Thread] Traitement : {url}")
     try:
-        if get_cached_transcription(url):
-            return idx, "done", None
-        run_full_analysis([url], job["keywords"], job["model"])
-        return idx, "done", None
+        if is_transcription_cached(url):
+            return idx, "done", None, None
+        run_full_analysis([url], job["keywords"], job["model"], escalation_model=job.get("escalation_model"))
+        return idx, "done", None, get_dedup_record(job)
     except Exception as e:
         print(f"Erreur lors de la transcription de {url}: {e}")
         # Ajoute le message d'erreur dans le job pour affichage côté front
-        return idx, "failed", f"{type(e).__name__}: {e}"
+        return idx, "failed", f"{type(e).__name__}: {e}", None
 
-def main():
+def main(max_workers=MAX_WORKERS, poll_interval=POLL_INTERVAL, batch_pause=BATCH_PAUSE):
     print("Worker multi-thread démarré.")
     while True:
         queue = load_queue()
@@ -43,7 +48,7 @@ def main():
                 print("Tous les jobs sont terminés. Arrêt du worker.")
                 break  # Sort de la boucle principale et termine le script
             else:
-                time.sleep(5)
+                time.sleep(poll_interval)
                 continue
 
         # Marquer les jobs comme "running"
@@ -51,18 +56,20 @@ def main():
             queue[i]["status"] = "running"
         save_queue(queue)
 
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
             futures = [executor.submit(process_job, i, job) for i, job in jobs_to_run]
             for future in as_completed(futures):
-                idx, status, error = future.result()
+                idx, status, error, dedup = future.result()
                 queue = load_queue()  # Recharge pour éviter les conflits d'écriture
                 queue[idx]["status"] = status
                 if status == "done":
                     queue[idx]["finished_at"] = time.time()
                 if error:
                     queue[idx]["error"] = error
+                if dedup:
+                    queue[idx]["dedup"] = dedup
                 save_queue(queue)
-        time.sleep(2)
+        time.sleep(batch_pause)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file